@@ -0,0 +1,41 @@
+import pandas as pd
+import numpy as np
+
+# Define exam periods
+EXAM_PERIODS = [
+    ('2024-03-25', '2024-03-29'),
+    ('2024-04-15', '2024-04-18'),
+    ('2024-04-23', '2024-04-27'),
+    ('2024-05-05', '2024-05-17'),
+    ('2024-06-01', '2024-06-07'),
+    ('2024-08-01', '2024-08-07'),
+    ('2024-08-20', '2024-08-26'),
+    ('2024-11-01', '2024-11-10'),
+    ('2024-11-15', '2024-11-30'),
+    ('2024-12-07', '2024-12-15'),
+    ('2024-12-29', '2025-01-09')
+]
+
+# Precompute exam period boundaries once for vectorized date lookups
+EXAM_STARTS = pd.to_datetime([start for start, _ in EXAM_PERIODS])
+EXAM_ENDS = pd.to_datetime([end for _, end in EXAM_PERIODS])
+
+def _merge_periods(starts, ends):
+    """Merge overlapping periods into disjoint [start, end) ranges, ends shifted by a day."""
+    order = np.argsort(starts)
+    merged = []
+    for start, end in zip(starts[order], ends[order] + np.timedelta64(1, 'D')):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+# Interleaved start/end boundaries of the disjoint periods; the odd/even
+# lookup in is_in_exam is only correct when no two periods overlap
+_EXAM_BOUNDS = np.array([bound for period in _merge_periods(EXAM_STARTS.values, EXAM_ENDS.values) for bound in period])
+
+def is_in_exam(dates):
+    """Check which of the given dates fall within exam periods."""
+    # A date is inside a period when it lands after an odd number of boundaries
+    return (np.searchsorted(_EXAM_BOUNDS, np.asarray(dates), side='right') & 1).astype(bool)
@@ -1,54 +1,78 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import re
+from concurrent.futures import ThreadPoolExecutor
+from exam_periods import is_in_exam
+import matplotlib
+matplotlib.use('Agg')  # Plots are only saved to files
 import matplotlib.pyplot as plt
 
-# Define exam periods
-EXAM_PERIODS = [
-    ('2024-03-25', '2024-03-29'),
-    ('2024-04-15', '2024-04-18'),
-    ('2024-04-23', '2024-04-27'),
-    ('2024-05-05', '2024-05-17'),
-    ('2024-06-01', '2024-06-07'),
-    ('2024-08-01', '2024-08-07'),
-    ('2024-08-20', '2024-08-26'),
-    ('2024-11-01', '2024-11-10'),
-    ('2024-11-15', '2024-11-30'),
-    ('2024-12-07', '2024-12-15'),
-    ('2024-12-29', '2025-01-09')
-]
+plt.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000
+})
+
+# Year of viewing history to analyze
+ANALYSIS_YEAR = 2024
 
 def extract_show_info(title):
     """Extract show name, season, and episode from title."""
-    # Pattern for "Show Name: Season X: Episode Name" or "Show Name: Season X: Episode Y"
-    pattern = r"^(.*?)(?:: Season (\d+))?(?:: (Episode \d+|.*?))?$"
-    match = re.match(pattern, title)
-    
-    if match:
-        show_name = match.group(1).strip()
-        season = match.group(2) if match.group(2) else None
-        episode = match.group(3) if match.group(3) else None
-        return show_name, season, episode
-    return title, None, None
-
-def load_data(file_path):
+    # Titles look like "Show Name: Season X: Episode Name" or "Show Name: Episode Name"
+    show_name, sep, rest = title.partition(': ')
+    if not sep:
+        return title.strip(), None, None
+    
+    season = None
+    episode = rest
+    if rest.startswith('Season '):
+        number, _, tail = rest[len('Season '):].partition(': ')
+        if number.isdecimal():
+            season, episode = number, tail
+    return show_name.strip(), season, (episode or None)
+
+def split_show_info(titles):
+    """Vectorized extract_show_info over a Series of titles."""
+    parts = titles.str.partition(': ')
+    rest = parts[2]
+    
+    season_parts = rest.str.slice(len('Season ')).str.partition(': ')
+    has_season = rest.str.startswith('Season ') & season_parts[0].str.isdecimal()
+    episode = season_parts[2].where(has_season, rest)
+    
+    return pd.DataFrame({
+        'show_name': parts[0].str.strip(),
+        'season': season_parts[0].where(has_season),
+        'episode': episode.where(episode != '')
+    }, index=titles.index)
+
+def load_data(file_path, engine='pyarrow', chunksize=None):
     """Load Netflix viewing history data."""
-    return pd.read_csv(file_path)
+    read_kwargs = dict(parse_dates=['Date'], date_format='%m/%d/%y')
+    if chunksize is not None:
+        # Stream the file and keep only rows from the analysis year, so the
+        # full history is never held in memory at once (the pyarrow engine
+        # cannot read in chunks)
+        chunks = pd.read_csv(file_path, engine='c', chunksize=chunksize, **read_kwargs)
+        return pd.concat((chunk[chunk['Date'].dt.year == ANALYSIS_YEAR] for chunk in chunks), ignore_index=True)
+    
+    try:
+        return pd.read_csv(file_path, engine=engine, **read_kwargs)
+    except ImportError:
+        # pyarrow is optional, fall back to the default C parser
+        return pd.read_csv(file_path, engine='c', **read_kwargs)
 
 def clean_data(df):
-    """Clean the dataframe and convert dates."""
-    # Convert date strings to datetime
-    df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%y')
-    
-    # Filter for year 2024 only
-    df = df[df['Date'].dt.year == 2024].copy()
+    """Clean the dataframe."""
+    # Filter for the analysis year only
+    df = df[df['Date'].dt.year == ANALYSIS_YEAR].copy()
     
     # Extract show information
-    show_info = df['Title'].apply(extract_show_info)
-    df['show_name'] = [x[0] for x in show_info]
-    df['season'] = [x[1] for x in show_info]
-    df['episode'] = [x[2] for x in show_info]
+    df[['show_name', 'season', 'episode']] = split_show_info(df['Title'])
+    
+    # Store repeated show information as categories
+    for col in ('show_name', 'season', 'episode'):
+        df[col] = df[col].astype('category')
     
     # Sort by date
     df = df.sort_values('Date')
@@ -56,21 +80,13 @@ def clean_data(df):
     # Reset index
     df = df.reset_index(drop=True)
     
-    print(f"Total entries for 2024: {len(df)}")
+    print(f"Total entries for {ANALYSIS_YEAR}: {len(df)}")
     
     return df
 
 def add_exam_period_flag(df):
     """Add a flag for whether each viewing date was during an exam period."""
-    def is_exam_period(date):
-        for start, end in EXAM_PERIODS:
-            start_date = pd.to_datetime(start)
-            end_date = pd.to_datetime(end)
-            if start_date <= date <= end_date:
-                return True
-        return False
-    
-    df['is_exam_period'] = df['Date'].apply(is_exam_period)
+    df['is_exam_period'] = is_in_exam(df['Date'])
     return df
 
 def add_time_features(df):
@@ -79,19 +95,23 @@ def add_time_features(df):
     df['month'] = df['Date'].dt.month
     df['day'] = df['Date'].dt.day
     df['day_of_week'] = df['Date'].dt.dayofweek
-    df['is_weekend'] = df['day_of_week'].isin([5, 6])  # 5=Saturday, 6=Sunday
+    df['is_weekend'] = df['day_of_week'].values >= 5  # 5=Saturday, 6=Sunday
     df['week_number'] = df['Date'].dt.isocalendar().week
     
+    # Downcast to the smallest dtypes that hold the values
+    for col in ('year', 'month', 'day', 'day_of_week', 'week_number'):
+        df[col] = pd.to_numeric(df[col], downcast='unsigned')
+    
     return df
 
 def calculate_viewing_metrics(df):
     """Calculate viewing metrics by different time periods."""
     # Daily viewing counts
-    daily_counts = df.groupby('Date').agg({
-        'Title': 'count',  # Number of shows watched
-        'show_name': 'nunique'  # Number of unique shows
-    }).reset_index()
-    daily_counts.columns = ['Date', 'daily_views', 'unique_shows']
+    gb_date = df.groupby('Date', sort=True, observed=True)
+    daily_counts = pd.concat([
+        gb_date['Title'].size().rename('daily_views'),  # Number of shows watched
+        gb_date['show_name'].nunique().rename('unique_shows')  # Number of unique shows
+    ], axis=1).reset_index()
     
     # Weekly viewing counts
     weekly_counts = df.groupby(['year', 'week_number']).size().reset_index(name='weekly_views')
@@ -105,101 +125,111 @@ def calculate_viewing_metrics(df):
     exam_period_stats.columns = ['is_exam_period', 'total_views', 'unique_shows', 'unique_days']
     
     # Viewing patterns by day of week
-    dow_stats = df.groupby(['is_exam_period', 'day_of_week']).size().reset_index(name='views')
+    dow_stats = pd.crosstab(df['is_exam_period'], df['day_of_week']).stack().reset_index(name='views')
     
     # Weekend vs Weekday stats
-    weekend_stats = df.groupby(['is_exam_period', 'is_weekend']).size().reset_index(name='views')
+    weekend_stats = pd.crosstab(df['is_exam_period'], df['is_weekend']).stack().reset_index(name='views')
     
     return daily_counts, weekly_counts, exam_period_stats, dow_stats, weekend_stats
 
 def calculate_binge_watching_metrics(df):
     """Calculate binge-watching related metrics."""
     # Define binge watching as 3 or more episodes of the same show in a day
-    daily_show_counts = df.groupby(['Date', 'show_name']).size().reset_index(name='episodes_watched')
-    binge_sessions = daily_show_counts[daily_show_counts['episodes_watched'] >= 3]
+    episodes_watched = df.groupby(['Date', 'show_name'], observed=True)['Title'].transform('size')
+    df = df.assign(is_binge_watching=episodes_watched >= 3)
     
     # Binge watching during exam vs non-exam periods
-    df_with_binge = df.merge(binge_sessions[['Date', 'show_name']], on=['Date', 'show_name'], how='left')
-    df_with_binge['is_binge_watching'] = ~df_with_binge['episodes_watched'].isna()
-    
-    binge_stats = df_with_binge.groupby('is_exam_period')['is_binge_watching'].agg(['sum', 'count']).reset_index()
+    binge_stats = df.groupby('is_exam_period', observed=True)['is_binge_watching'].agg(['sum', 'count']).reset_index()
     binge_stats['binge_watching_ratio'] = binge_stats['sum'] / binge_stats['count']
     
     return binge_stats
 
 def create_visualizations(df, daily_counts, weekly_counts, exam_period_stats, dow_stats, weekend_stats, output_dir):
     """Create and save visualization plots."""
+    # Reuse one figure for every plot, clearing the axes between saves
+    fig, ax = plt.subplots()
+
     # 1. Daily viewing pattern
-    plt.figure(figsize=(15, 6))
-    plt.plot(daily_counts['Date'], daily_counts['daily_views'], marker='o')
-    plt.title('Daily Netflix Viewing Pattern (2024)')
-    plt.xlabel('Date')
-    plt.ylabel('Number of Episodes/Movies Watched')
-    plt.xticks(rotation=45)
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/daily_pattern.png")
-    plt.close()
+    fig.set_size_inches(15, 6)
+    ax.plot(daily_counts['Date'], daily_counts['daily_views'], marker='')
+    ax.set_title('Daily Netflix Viewing Pattern (2024)')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Number of Episodes/Movies Watched')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(f"{output_dir}/daily_pattern.png", dpi=90)
+    ax.clear()
+    ax.tick_params(axis='x', labelrotation=0)  # clear() keeps tick settings
 
     # 2. Exam vs Non-exam Period Comparison
-    plt.figure(figsize=(10, 6))
-    plt.bar(exam_period_stats['is_exam_period'].astype(str), exam_period_stats['total_views'])
-    plt.title('Viewing During Exam vs Non-exam Periods')
-    plt.xlabel('Exam Period')
-    plt.ylabel('Total Views')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/exam_comparison.png")
-    plt.close()
+    fig.set_size_inches(10, 6)
+    ax.bar(exam_period_stats['is_exam_period'].astype(str), exam_period_stats['total_views'])
+    ax.set_title('Viewing During Exam vs Non-exam Periods')
+    ax.set_xlabel('Exam Period')
+    ax.set_ylabel('Total Views')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(f"{output_dir}/exam_comparison.png", dpi=90)
+    ax.clear()
 
     # 3. Day of Week Pattern
-    plt.figure(figsize=(12, 6))
+    fig.set_size_inches(12, 6)
     for is_exam in [False, True]:
         data = dow_stats[dow_stats['is_exam_period'] == is_exam]
         label = 'Exam Period' if is_exam else 'Non-exam Period'
-        plt.bar(data['day_of_week'] + (0.4 if is_exam else 0), data['views'], 
+        ax.bar(data['day_of_week'] + (0.4 if is_exam else 0), data['views'], 
                width=0.4, label=label)
-    plt.title('Viewing Pattern by Day of Week')
-    plt.xlabel('Day of Week (0=Monday, 6=Sunday)')
-    plt.ylabel('Number of Views')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/day_of_week_pattern.png")
-    plt.close()
+    ax.set_title('Viewing Pattern by Day of Week')
+    ax.set_xlabel('Day of Week (0=Monday, 6=Sunday)')
+    ax.set_ylabel('Number of Views')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(f"{output_dir}/day_of_week_pattern.png", dpi=90)
+    ax.clear()
 
     # 4. Weekend vs Weekday
-    plt.figure(figsize=(10, 6))
+    fig.set_size_inches(10, 6)
     for is_exam in [False, True]:
         data = weekend_stats[weekend_stats['is_exam_period'] == is_exam]
         label = 'Exam Period' if is_exam else 'Non-exam Period'
-        plt.bar(data['is_weekend'].astype(str) + (' (Exam)' if is_exam else ' (Non-exam)'), 
+        ax.bar(data['is_weekend'].astype(str) + (' (Exam)' if is_exam else ' (Non-exam)'), 
                data['views'], label=label)
-    plt.title('Weekend vs Weekday Viewing Pattern')
-    plt.xlabel('Is Weekend')
-    plt.ylabel('Number of Views')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/weekend_pattern.png")
-    plt.close()
+    ax.set_title('Weekend vs Weekday Viewing Pattern')
+    ax.set_xlabel('Is Weekend')
+    ax.set_ylabel('Number of Views')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(f"{output_dir}/weekend_pattern.png", dpi=90)
+    ax.clear()
 
     # 5. Weekly Viewing Pattern
-    plt.figure(figsize=(15, 6))
-    plt.plot(weekly_counts['week_number'], weekly_counts['weekly_views'], marker='o')
-    plt.title('Weekly Netflix Viewing Pattern (2024)')
-    plt.xlabel('Week Number')
-    plt.ylabel('Number of Episodes/Movies Watched')
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/weekly_pattern.png")
-    plt.close()
-
-def process_netflix_data(input_file, output_dir):
+    fig.set_size_inches(15, 6)
+    ax.plot(weekly_counts['week_number'], weekly_counts['weekly_views'], marker='o')
+    ax.set_title('Weekly Netflix Viewing Pattern (2024)')
+    ax.set_xlabel('Week Number')
+    ax.set_ylabel('Number of Episodes/Movies Watched')
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(f"{output_dir}/weekly_pattern.png", dpi=90)
+    plt.close(fig)
+
+def save_table(df, output_dir, name):
+    """Save a table as CSV, plus a typed Parquet copy for the statistical tests."""
+    df.to_csv(f"{output_dir}/{name}.csv", index=False)
+    try:
+        df.to_parquet(f"{output_dir}/{name}.parquet", index=False, compression='zstd')
+    except ImportError:
+        # pyarrow is optional, the CSV copy is always written
+        pass
+
+def process_netflix_data(input_file, output_dir, chunksize=None):
     """Main function to process Netflix viewing history."""
     # Load data
     print("Loading data...")
-    df = load_data(input_file)
+    df = load_data(input_file, chunksize=chunksize)
     
     # Clean data
     print("Cleaning data...")
@@ -223,12 +253,19 @@ def process_netflix_data(input_file, output_dir):
     
     # Save processed data
     print("Saving processed data...")
-    df.to_csv(f"{output_dir}/processed_netflix_data.csv", index=False)
-    daily_counts.to_csv(f"{output_dir}/daily_viewing_counts.csv", index=False)
-    weekly_counts.to_csv(f"{output_dir}/weekly_viewing_counts.csv", index=False)
-    exam_period_stats.to_csv(f"{output_dir}/exam_period_stats.csv", index=False)
-    dow_stats.to_csv(f"{output_dir}/day_of_week_stats.csv", index=False)
-    weekend_stats.to_csv(f"{output_dir}/weekend_stats.csv", index=False)
+    tables = [
+        (df, "processed_netflix_data"),
+        (daily_counts, "daily_viewing_counts"),
+        (weekly_counts, "weekly_viewing_counts"),
+        (exam_period_stats, "exam_period_stats"),
+        (dow_stats, "day_of_week_stats"),
+        (weekend_stats, "weekend_stats")
+    ]
+    # Writes are I/O bound, so overlap them in threads
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        futures = [executor.submit(save_table, table, output_dir, name) for table, name in tables]
+        for future in futures:
+            future.result()
     
     print("Data processing and visualization completed!")
     return df, daily_counts, weekly_counts, exam_period_stats, dow_stats, weekend_stats
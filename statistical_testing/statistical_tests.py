@@ -1,82 +1,132 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
+import matplotlib
+matplotlib.use('Agg')  # Plots are only saved to files
 import matplotlib.pyplot as plt
+from matplotlib import cbook
+from matplotlib.lines import Line2D
 import seaborn as sns
 from pathlib import Path
 import os
+import sys
+from functools import lru_cache
 
+# Exam periods are shared with the data processing step
+sys.path.insert(0, str(Path(__file__).parent.parent / "data_processing"))
+from exam_periods import is_in_exam
+
+# Daily counts fit comfortably in 32 bits
+DAILY_VIEWS_DTYPES = {'daily_views': 'int32', 'unique_shows': 'int32'}
+
+def read_table(data_dir, name, date_columns=(), dtype=None):
+    """Read a table written by process_netflix_data, preferring its Parquet copy."""
+    csv_path = data_dir / f"{name}.csv"
+    parquet_path = data_dir / f"{name}.parquet"
+    
+    # Use the Parquet copy unless the CSV has been rewritten since
+    if parquet_path.exists() and (not csv_path.exists() or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime):
+        try:
+            return pd.read_parquet(parquet_path)
+        except ImportError:
+            # pyarrow is optional, fall back to the CSV copy
+            pass
+    
+    # Parse dates while reading instead of in a second pass
+    df = pd.read_csv(csv_path, parse_dates=list(date_columns), cache_dates=True, dtype=dtype, memory_map=True)
+    
+    # Cache a typed Parquet copy so later runs skip parsing the CSV; the
+    # cache is optional (pyarrow may be missing, the checkout may be read-only)
+    try:
+        df.to_parquet(parquet_path, index=False, compression='zstd')
+    except (ImportError, OSError):
+        pass
+    
+    return df
+
+@lru_cache(maxsize=1)
 def load_data():
-    """Load the required data files."""
+    """Load the required data files (cached, callers must not modify them)."""
     # Get the absolute path to the data_processing directory
     current_dir = Path(__file__).parent
     data_dir = current_dir.parent / "data_processing"
     
     # Load daily viewing counts
-    daily_views = pd.read_csv(data_dir / "daily_viewing_counts.csv")
-    daily_views['Date'] = pd.to_datetime(daily_views['Date'])
+    daily_views = read_table(data_dir, "daily_viewing_counts", date_columns=['Date'], dtype=DAILY_VIEWS_DTYPES)
+    # Parquet copies keep the processing dtypes, so cast those as well
+    daily_views = daily_views.astype(DAILY_VIEWS_DTYPES)
     
     # Load exam period stats
-    exam_stats = pd.read_csv(data_dir / "exam_period_stats.csv")
+    exam_stats = read_table(data_dir, "exam_period_stats")
     
     return daily_views, exam_stats
 
-def is_exam_period(date):
-    """Check if a given date falls within exam periods."""
-    EXAM_PERIODS = [
-        ('2024-03-25', '2024-03-29'),
-        ('2024-04-15', '2024-04-18'),
-        ('2024-04-23', '2024-04-27'),
-        ('2024-05-05', '2024-05-17'),
-        ('2024-06-01', '2024-06-07'),
-        ('2024-08-01', '2024-08-07'),
-        ('2024-08-20', '2024-08-26'),
-        ('2024-11-01', '2024-11-10'),
-        ('2024-11-15', '2024-11-30'),
-        ('2024-12-07', '2024-12-15'),
-        ('2024-12-29', '2025-01-09')
-    ]
-    
-    for start, end in EXAM_PERIODS:
-        start_date = pd.to_datetime(start)
-        end_date = pd.to_datetime(end)
-        if start_date <= date <= end_date:
-            return True
-    return False
+def mann_whitney_u(x, y, method='auto'):
+    """Two-sided Mann-Whitney U test from a single ranking of both samples."""
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        # The test is undefined without observations in both groups
+        return np.nan, np.nan
+    
+    combined = np.concatenate([x, y])
+    _, tie_counts = np.unique(combined, return_counts=True)
+    
+    # Same choice as SciPy's 'auto': exact unless both samples are large or there are ties
+    if method == 'auto':
+        has_ties = (tie_counts > 1).any()
+        method = 'asymptotic' if (n1 > 8 and n2 > 8) or has_ties else 'exact'
+    if method != 'asymptotic':
+        # Exact p-values need SciPy's permutation distribution
+        return stats.mannwhitneyu(x, y, alternative='two-sided', method=method)
+    
+    ranks = stats.rankdata(combined)
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    u = max(u1, n1 * n2 - u1)
+    
+    # Normal approximation with tie and continuity corrections
+    n = n1 + n2
+    tie_term = (tie_counts ** 3 - tie_counts).sum()
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        # Every value is tied, so the samples cannot differ
+        return u1, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    p_value = min(2 * stats.norm.sf(z), 1.0)
+    
+    return u1, p_value
 
-def mann_whitney_test(daily_views):
+def mann_whitney_test(daily_views, is_exam):
     """Perform Mann-Whitney U test on daily viewing counts."""
-    # Add exam period flag to daily views
-    daily_views['is_exam_period'] = daily_views['Date'].apply(is_exam_period)
-    
-    # Get viewing counts for exam and non-exam periods
-    exam_views = daily_views[daily_views['is_exam_period']]['daily_views']
-    non_exam_views = daily_views[~daily_views['is_exam_period']]['daily_views']
+    # Get viewing counts for exam and non-exam periods as float64 arrays,
+    # splitting with the boolean mask without touching the DataFrame
+    views = daily_views['daily_views'].to_numpy(dtype=np.float64)
+    exam_views = views[is_exam]
+    non_exam_views = views[~is_exam]
     
     # Perform Mann-Whitney U test
-    statistic, p_value = stats.mannwhitneyu(
-        exam_views, 
-        non_exam_views,
-        alternative='two-sided'
-    )
+    statistic, p_value = mann_whitney_u(exam_views, non_exam_views)
     
     return {
         'test_name': "Mann-Whitney U Test",
         'statistic': statistic,
         'p_value': p_value,
-        'exam_mean': exam_views.mean(),
-        'non_exam_mean': non_exam_views.mean(),
-        'exam_median': exam_views.median(),
-        'non_exam_median': non_exam_views.median()
+        # Empty groups have no descriptive statistics
+        'exam_mean': exam_views.mean() if exam_views.size else np.nan,
+        'non_exam_mean': non_exam_views.mean() if non_exam_views.size else np.nan,
+        'exam_median': np.median(exam_views) if exam_views.size else np.nan,
+        'non_exam_median': np.median(non_exam_views) if non_exam_views.size else np.nan,
+        'exam_arr': exam_views,
+        'non_exam_arr': non_exam_views
     }
 
 def chi_square_test(exam_stats):
     """Perform Chi-square test on viewing frequencies."""
     # Extract values from exam_stats
-    exam_views = exam_stats[exam_stats['is_exam_period']]['total_views'].iloc[0]
-    non_exam_views = exam_stats[~exam_stats['is_exam_period']]['total_views'].iloc[0]
-    exam_days = exam_stats[exam_stats['is_exam_period']]['unique_days'].iloc[0]
-    non_exam_days = exam_stats[~exam_stats['is_exam_period']]['unique_days'].iloc[0]
+    es = exam_stats.set_index('is_exam_period')
+    exam_views = es.at[True, 'total_views']
+    non_exam_views = es.at[False, 'total_views']
+    exam_days = es.at[True, 'unique_days']
+    non_exam_days = es.at[False, 'unique_days']
     
     # Calculate expected frequencies (proportional to number of days)
     total_views = exam_views + non_exam_views
@@ -102,103 +152,74 @@ def chi_square_test(exam_stats):
         'non_exam_rate': non_exam_views / non_exam_days
     }
 
-def print_results(mann_whitney_results, chi_square_results):
-    """Print the results of both statistical tests."""
-    print("\nStatistical Test Results for Netflix Viewing Patterns")
-    print("=" * 50)
-    
-    # Mann-Whitney U Test Results
-    print("\n1. Mann-Whitney U Test Results")
-    print("-" * 30)
-    print(f"Testing if daily viewing counts differ between exam and non-exam periods")
-    print(f"Statistic: {mann_whitney_results['statistic']:.4f}")
-    print(f"P-value: {mann_whitney_results['p_value']:.4f}")
-    print("\nDescriptive Statistics:")
-    print(f"Exam Period - Mean: {mann_whitney_results['exam_mean']:.2f}, Median: {mann_whitney_results['exam_median']:.2f}")
-    print(f"Non-exam Period - Mean: {mann_whitney_results['non_exam_mean']:.2f}, Median: {mann_whitney_results['non_exam_median']:.2f}")
-    
-    # Chi-square Test Results
-    print("\n2. Chi-square Test Results")
-    print("-" * 30)
-    print(f"Testing if viewing frequency differs between exam and non-exam periods")
-    print(f"Statistic: {chi_square_results['statistic']:.4f}")
-    print(f"P-value: {chi_square_results['p_value']:.4f}")
-    print("\nViewing Rates (views per day):")
-    print(f"Exam Period: {chi_square_results['exam_rate']:.2f}")
-    print(f"Non-exam Period: {chi_square_results['non_exam_rate']:.2f}")
-    
-    # Overall Conclusion
-    print("\nConclusion")
-    print("-" * 30)
+RESULTS_TEMPLATE = """Statistical Test Results for Netflix Viewing Patterns
+==================================================
+
+1. Mann-Whitney U Test Results
+------------------------------
+Testing if daily viewing counts differ between exam and non-exam periods
+Statistic: {mw[statistic]:.4f}
+P-value: {mw[p_value]:.4f}
+
+Descriptive Statistics:
+Exam Period - Mean: {mw[exam_mean]:.2f}, Median: {mw[exam_median]:.2f}
+Non-exam Period - Mean: {mw[non_exam_mean]:.2f}, Median: {mw[non_exam_median]:.2f}
+
+2. Chi-square Test Results
+------------------------------
+Testing if viewing frequency differs between exam and non-exam periods
+Statistic: {chi[statistic]:.4f}
+P-value: {chi[p_value]:.4f}
+
+Viewing Rates (views per day):
+Exam Period: {chi[exam_rate]:.2f}
+Non-exam Period: {chi[non_exam_rate]:.2f}
+
+Conclusion
+------------------------------
+{conclusion}
+"""
+
+def format_results(mann_whitney_results, chi_square_results):
+    """Format the results of both statistical tests as a single report."""
     alpha = 0.05
     
     mw_significant = mann_whitney_results['p_value'] < alpha
     chi_significant = chi_square_results['p_value'] < alpha
     
     if mw_significant and chi_significant:
-        print("Both tests show significant differences in viewing patterns during exam periods.")
+        conclusion = "Both tests show significant differences in viewing patterns during exam periods."
     elif mw_significant:
-        print("Daily viewing patterns show significant differences, but overall viewing frequency does not.")
+        conclusion = "Daily viewing patterns show significant differences, but overall viewing frequency does not."
     elif chi_significant:
-        print("Overall viewing frequency shows significant differences, but daily patterns do not.")
+        conclusion = "Overall viewing frequency shows significant differences, but daily patterns do not."
     else:
-        print("Neither test shows significant differences in viewing patterns during exam periods.")
+        conclusion = "Neither test shows significant differences in viewing patterns during exam periods."
+    
+    return RESULTS_TEMPLATE.format(mw=mann_whitney_results, chi=chi_square_results, conclusion=conclusion)
+
+def print_results(mann_whitney_results, chi_square_results):
+    """Print the results of both statistical tests."""
+    sys.stdout.write("\n" + format_results(mann_whitney_results, chi_square_results))
 
 def save_results_to_file(mann_whitney_results, chi_square_results, output_dir):
     """Save test results to a text file."""
     output_path = output_dir / "statistical_test_results.txt"
     
     with open(output_path, "w") as f:
-        f.write("Statistical Test Results for Netflix Viewing Patterns\n")
-        f.write("=" * 50 + "\n\n")
-        
-        # Mann-Whitney U Test Results
-        f.write("1. Mann-Whitney U Test Results\n")
-        f.write("-" * 30 + "\n")
-        f.write(f"Testing if daily viewing counts differ between exam and non-exam periods\n")
-        f.write(f"Statistic: {mann_whitney_results['statistic']:.4f}\n")
-        f.write(f"P-value: {mann_whitney_results['p_value']:.4f}\n\n")
-        f.write("Descriptive Statistics:\n")
-        f.write(f"Exam Period - Mean: {mann_whitney_results['exam_mean']:.2f}, Median: {mann_whitney_results['exam_median']:.2f}\n")
-        f.write(f"Non-exam Period - Mean: {mann_whitney_results['non_exam_mean']:.2f}, Median: {mann_whitney_results['non_exam_median']:.2f}\n\n")
-        
-        # Chi-square Test Results
-        f.write("2. Chi-square Test Results\n")
-        f.write("-" * 30 + "\n")
-        f.write(f"Testing if viewing frequency differs between exam and non-exam periods\n")
-        f.write(f"Statistic: {chi_square_results['statistic']:.4f}\n")
-        f.write(f"P-value: {chi_square_results['p_value']:.4f}\n\n")
-        f.write("Viewing Rates (views per day):\n")
-        f.write(f"Exam Period: {chi_square_results['exam_rate']:.2f}\n")
-        f.write(f"Non-exam Period: {chi_square_results['non_exam_rate']:.2f}\n\n")
-        
-        # Overall Conclusion
-        f.write("Conclusion\n")
-        f.write("-" * 30 + "\n")
-        alpha = 0.05
-        
-        mw_significant = mann_whitney_results['p_value'] < alpha
-        chi_significant = chi_square_results['p_value'] < alpha
-        
-        if mw_significant and chi_significant:
-            f.write("Both tests show significant differences in viewing patterns during exam periods.\n")
-        elif mw_significant:
-            f.write("Daily viewing patterns show significant differences, but overall viewing frequency does not.\n")
-        elif chi_significant:
-            f.write("Overall viewing frequency shows significant differences, but daily patterns do not.\n")
-        else:
-            f.write("Neither test shows significant differences in viewing patterns during exam periods.\n")
+        f.write(format_results(mann_whitney_results, chi_square_results))
 
-def create_visualizations(daily_views, mann_whitney_results, chi_square_results, output_dir):
+def create_visualizations(mann_whitney_results, chi_square_results, output_dir):
     """Create and save visualization plots for both statistical tests."""
     # 1. Mann-Whitney U Test Visualization - Box Plot
     plt.figure(figsize=(12, 6))
     
-    # Create box plot
-    plt.boxplot([
-        daily_views[~daily_views['is_exam_period']]['daily_views'],
-        daily_views[daily_views['is_exam_period']]['daily_views']
-    ], labels=['Non-exam Period', 'Exam Period'])
+    # Create box plot (same work as plt.boxplot, whose labels= keyword was
+    # removed in newer Matplotlib releases)
+    plt.gca().bxp(cbook.boxplot_stats([
+        mann_whitney_results['non_exam_arr'],
+        mann_whitney_results['exam_arr']
+    ], labels=['Non-exam Period', 'Exam Period']))
     
     plt.title('Daily Viewing Counts: Exam vs Non-exam Periods\nMann-Whitney U Test', pad=20)
     plt.xlabel('Period Type')
@@ -214,17 +235,19 @@ def create_visualizations(daily_views, mann_whitney_results, chi_square_results,
     plt.axhline(y=mann_whitney_results['exam_mean'], color='r', linestyle='--', alpha=0.3)
     
     # Add legend for means
-    plt.plot([], [], color='b', linestyle='--', alpha=0.3, label=f'Non-exam Mean: {mann_whitney_results["non_exam_mean"]:.2f}')
-    plt.plot([], [], color='r', linestyle='--', alpha=0.3, label=f'Exam Mean: {mann_whitney_results["exam_mean"]:.2f}')
-    plt.legend()
+    plt.legend(handles=[
+        Line2D([0], [0], color='b', linestyle='--', alpha=0.3, label=f'Non-exam Mean: {mann_whitney_results["non_exam_mean"]:.2f}'),
+        Line2D([0], [0], color='r', linestyle='--', alpha=0.3, label=f'Exam Mean: {mann_whitney_results["exam_mean"]:.2f}')
+    ])
     
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(output_dir / "mann_whitney_visualization.png", dpi=300, bbox_inches='tight')
-    plt.close()
+    plt.savefig(output_dir / "mann_whitney_visualization.png", dpi=150)
+    
+    # Reuse the same figure for the next plot
+    plt.clf()
 
     # 2. Chi-square Test Visualization - Bar Plot
-    plt.figure(figsize=(12, 6))
     
     # Calculate daily rates
     exam_rate = chi_square_results['exam_rate']
@@ -235,7 +258,7 @@ def create_visualizations(daily_views, mann_whitney_results, chi_square_results,
     rates = [exam_rate, non_exam_rate]
     
     # Create bars
-    plt.bar(periods, rates, color=['skyblue', 'skyblue'])
+    bars = plt.bar(periods, rates, color=['skyblue', 'skyblue'])
     
     # Customize plot
     plt.title('Average Daily Views: Exam vs Non-exam Periods\nChi-square Test', pad=20)
@@ -243,8 +266,7 @@ def create_visualizations(daily_views, mann_whitney_results, chi_square_results,
     plt.ylabel('Average Number of Views per Day')
     
     # Add value labels on bars
-    for i, v in enumerate(rates):
-        plt.text(i, v, f'{v:.2f}', ha='center', va='bottom')
+    plt.gca().bar_label(bars, fmt='%.2f')
     
     # Add p-value annotation
     plt.annotate(f'p-value: {chi_square_results["p_value"]:.4f}',
@@ -253,7 +275,7 @@ def create_visualizations(daily_views, mann_whitney_results, chi_square_results,
     
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(output_dir / "chi_square_visualization.png", dpi=300, bbox_inches='tight')
+    plt.savefig(output_dir / "chi_square_visualization.png", dpi=150)
     plt.close()
 
 def main():
@@ -264,8 +286,11 @@ def main():
     # Get output directory
     output_dir = Path(__file__).parent
     
+    # Flag exam period days once and reuse the mask
+    is_exam = is_in_exam(daily_views['Date'])
+    
     # Perform tests
-    mann_whitney_results = mann_whitney_test(daily_views)
+    mann_whitney_results = mann_whitney_test(daily_views, is_exam)
     chi_square_results = chi_square_test(exam_stats)
     
     # Print results
@@ -275,7 +300,7 @@ def main():
     save_results_to_file(mann_whitney_results, chi_square_results, output_dir)
     
     # Create and save visualization
-    create_visualizations(daily_views, mann_whitney_results, chi_square_results, output_dir)
+    create_visualizations(mann_whitney_results, chi_square_results, output_dir)
     
     print("\nResults have been saved to 'statistical_test_results.txt'")
     print("Visualization has been saved as 'mann_whitney_visualization.png'")